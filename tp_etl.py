@@ -1,6 +1,51 @@
-import pandas as pd 
+from __future__ import annotations
+
+import csv
+import hashlib
+import importlib.util
+import inspect
+import json
 import os
-import sqlite3
+import queue
+import sys
+import threading
+import time
+
+
+def _import_paresseux(nom_module: str):
+    """
+    Importe un module de facon differee : il n'est reellement charge qu'au
+    premier acces a l'un de ses attributs
+
+    :param nom_module: Le nom du module
+    :return: Le module (charge ou differe)
+    """
+    if nom_module in sys.modules:
+        return sys.modules[nom_module]
+
+    spec = importlib.util.find_spec(nom_module)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[nom_module] = module
+    loader.exec_module(module)
+
+    return module
+
+
+# Imports lourds differes : le menu et l'inspection rapide n'en ont pas besoin
+pd = _import_paresseux('pandas')
+np = _import_paresseux('numpy')
+
+
+# Le dossier et la liste des sources
+SOURCES_DIR = './sqlite_exports'
+SOURCES = [
+    'customers','orders','order_pymts',
+    'products','geoloc','order_items',
+    'order_reviews','sellers','translation',
+]
+
 
 def read_csv_file(file_name) -> pd.DataFrame:
     """
@@ -8,7 +53,7 @@ def read_csv_file(file_name) -> pd.DataFrame:
         :param file_name: File name
         return: Un dataframe pandas
     """
-    df = pd.read_csv(f'./sqlite_exports/{file_name}.csv', low_memory=False)
+    df = pd.read_csv(os.path.join(SOURCES_DIR, f'{file_name}.csv'), low_memory=False)
     if 'index' in df.columns:
         df = df.drop(columns=['index'])
 
@@ -44,22 +89,387 @@ def extract_sources() -> dict[str, pd.DataFrame]:
     Charger les donnees sources a partir des fichiers csv et les stocker
     dans un dictionnaire de dataframe
     """
-    # La liste des sources
-    fichiers = [
-        'customers','orders','order_pymts',
-        'products','geoloc','order_items',
-        'order_reviews','sellers','translation',
-    ]
-    
     # Cree un dict vide
     data_dict = {}
 
-    for file in fichiers:
+    for file in SOURCES:
         data_dict[file] = read_csv_file(file)
 
     return data_dict
 
 
+# ============================================================================
+# PARTIE 1 bis: CACHE ARROW IPC (lecture memory-map sans copie)
+# ============================================================================
+CACHE_ARROW_DIR = 'outputs/cache'
+
+
+def _importer_pyarrow():
+    """
+    Importe pyarrow (dependance optionnelle du cache Arrow)
+
+    :return: Le module pyarrow, ou None s'il n'est pas installe
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        print("Erreur : pyarrow n'est pas installe (pip install pyarrow), cache Arrow desactive.")
+        return None
+    return pyarrow
+
+
+def chemin_cache_arrow(nom_table: str, etape: str, cache_dir: str = CACHE_ARROW_DIR) -> str:
+    """
+    Chemin du fichier Arrow d'une table
+
+    :param nom_table: Le nom de la table
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param cache_dir: Le dossier du cache
+    """
+    return os.path.join(cache_dir, etape, f'{nom_table}.arrow')
+
+
+def signature_fichier(chemin: str) -> list[int] | None:
+    """
+    Signature d'un fichier : taille et date de modification en nanosecondes
+
+    :param chemin: Le chemin du fichier
+    :return: [taille, mtime_ns], ou None si le fichier n'existe pas
+    """
+    if not os.path.exists(chemin):
+        return None
+    stat = os.stat(chemin)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def metadonnees_source(nom_table: str) -> dict[str, str] | None:
+    """
+    Metadonnees attendues du cache 'extract' d'une table : la signature du
+    CSV source
+
+    :param nom_table: Le nom de la table
+    :return: Les metadonnees, ou None si le CSV source n'existe pas
+    """
+    signature = signature_fichier(os.path.join(SOURCES_DIR, f'{nom_table}.csv'))
+    if signature is None:
+        return None
+    return {'signature_source': json.dumps(signature)}
+
+
+def sauvegarder_cache_arrow(dfs: dict[str, pd.DataFrame], etape: str,
+                            metadonnees: dict[str, dict[str, str] | None],
+                            cache_dir: str = CACHE_ARROW_DIR) -> None:
+    """
+    Docstring for sauvegarder_cache_arrow
+    Sauvegarde les tables au format Arrow IPC non compresse pour pouvoir
+    les relire par memory-map sans copie. Les metadonnees (ex: signature de
+    la source) sont ecrites dans le schema et verifiees a la relecture.
+
+    :param dfs: Le dictionnaire de dataframes
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param metadonnees: Les metadonnees de chaque table (None: pas de cache)
+    :param cache_dir: Le dossier du cache
+    """
+    pa = _importer_pyarrow()
+    if pa is None:
+        return
+
+    os.makedirs(os.path.join(cache_dir, etape), exist_ok=True)
+
+    nb_tables = 0
+    for nom_table, df in dfs.items():
+        chemin = chemin_cache_arrow(nom_table, etape, cache_dir)
+        if metadonnees.get(nom_table) is None:
+            # Provenance inconnue : un cache ne pourrait pas etre verifie
+            if os.path.exists(chemin):
+                os.remove(chemin)
+            continue
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowTypeError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            # Ex: colonne object avec des types melanges : pas de cache pour cette table
+            print(f"Cache Arrow ignore pour {nom_table}: {e}")
+            if os.path.exists(chemin):
+                os.remove(chemin)
+            continue
+
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadonnees[nom_table]})
+
+        # Ecriture dans un fichier temporaire puis remplacement atomique :
+        # un autre processus ne voit jamais un fichier a moitie ecrit
+        chemin_tmp = chemin + '.tmp'
+        with pa.OSFile(chemin_tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(chemin_tmp, chemin)
+        nb_tables += 1
+
+    print(f"Cache Arrow '{etape}' sauvegarde: {nb_tables} tables dans {os.path.join(cache_dir, etape)}")
+
+
+def cache_arrow_a_jour(nom_table: str, etape: str, attendu: dict[str, str] | None,
+                       cache_dir: str = CACHE_ARROW_DIR) -> bool:
+    """
+    Verifie que le fichier Arrow d'une table existe et que les metadonnees
+    de son schema sont exactement celles attendues
+
+    :param nom_table: Le nom de la table
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param attendu: Les metadonnees attendues (None: jamais a jour)
+    :param cache_dir: Le dossier du cache
+    """
+    chemin = chemin_cache_arrow(nom_table, etape, cache_dir)
+    if attendu is None or not os.path.exists(chemin):
+        return False
+
+    pa = _importer_pyarrow()
+    if pa is None:
+        return False
+
+    try:
+        # Seul le schema est lu
+        schema = pa.ipc.open_file(pa.memory_map(chemin, 'r')).schema
+    except pa.ArrowInvalid:
+        return False
+
+    presentes = schema.metadata or {}
+    return all(presentes.get(cle.encode()) == valeur.encode() for cle, valeur in attendu.items())
+
+
+def ouvrir_table_arrow(nom_table: str, etape: str, cache_dir: str = CACHE_ARROW_DIR):
+    """
+    Ouvre une table du cache par memory-map (les donnees restent dans le
+    page cache partage, rien n'est copie a l'ouverture)
+
+    :param nom_table: Le nom de la table
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param cache_dir: Le dossier du cache
+    :return: Une pyarrow.Table, ou None si absente
+    """
+    chemin = chemin_cache_arrow(nom_table, etape, cache_dir)
+    if not os.path.exists(chemin):
+        return None
+
+    pa = _importer_pyarrow()
+    if pa is None:
+        return None
+
+    return pa.ipc.open_file(pa.memory_map(chemin, 'r')).read_all()
+
+
+def charger_cache_arrow(etape: str, metadonnees: dict[str, dict[str, str] | None],
+                        cache_dir: str = CACHE_ARROW_DIR) -> dict[str, pd.DataFrame]:
+    """
+    Docstring for charger_cache_arrow
+    Charger les tables du cache Arrow dans un dictionnaire de dataframe
+
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param metadonnees: Les metadonnees attendues de chaque table du cache
+    :param cache_dir: Le dossier du cache
+    :return: Le dictionnaire de dataframes (vide si cache absent ou obsolete)
+    """
+    tables = list(metadonnees)
+    # Toutes les tables doivent etre presentes avec les metadonnees attendues
+    obsoletes = [nom_table for nom_table in tables
+                 if not cache_arrow_a_jour(nom_table, etape, metadonnees[nom_table], cache_dir)]
+    if obsoletes:
+        print(f"Cache Arrow absent ou obsolete pour: {', '.join(obsoletes)}")
+        return {}
+
+    data_dict = {}
+
+    for nom_table in tables:
+        table = ouvrir_table_arrow(nom_table, etape, cache_dir)
+        if table is None:
+            return {}
+        # split_blocks evite la consolidation : les colonnes numeriques sans
+        # valeurs manquantes pointent directement sur le fichier mappe
+        data_dict[nom_table] = table.to_pandas(split_blocks=True)
+        print(f"Cache {nom_table}: {data_dict[nom_table].shape}")
+
+    return data_dict
+
+
+def _afficher_lignes(colonnes: list[str], lignes: list[list], largeur: int = 20) -> None:
+    """
+    Affiche quelques lignes en colonnes alignees (sans pandas)
+
+    :param colonnes: Les noms des colonnes
+    :param lignes: Les lignes a afficher
+    :param largeur: La largeur maximale d'une colonne
+    """
+    def cellule(valeur):
+        texte = '' if valeur is None else str(valeur).replace('\n', ' ')
+        return texte[:largeur].ljust(largeur)
+
+    print(' '.join(cellule(col) for col in colonnes))
+    for ligne in lignes:
+        print(' '.join(cellule(valeur) for valeur in ligne))
+
+
+def inspecter_table_arrow(nom_table: str, etape: str, head=5, cache_dir: str = CACHE_ARROW_DIR) -> bool:
+    """
+    Docstring for inspecter_table_arrow
+    Inspecter une table du cache sans la convertir en dataframe : dimension,
+    schema et valeurs manquantes viennent des metadonnees Arrow
+
+    :param nom_table: Le nom de la table
+    :param etape: L'etape du pipeline (ex: 'extract')
+    :param head: Le nombre de lignes a afficher
+    :return: True si la table a ete trouvee dans le cache
+    """
+    table = ouvrir_table_arrow(nom_table, etape, cache_dir)
+    if table is None:
+        return False
+
+    print(f"=============== Inspecter les donnees de {nom_table} (cache Arrow) =================")
+    print(f"La dimension de la table est : {(table.num_rows, table.num_columns)}")
+    print("Les types de donnees sont : ")
+    print(table.schema.to_string(show_schema_metadata=False))
+    print(f"Les {head} premieres lignes de la table sont : ")
+    _afficher_lignes(table.column_names, [list(ligne.values()) for ligne in table.slice(0, head).to_pylist()])
+
+    print("Le nombre de valeurs manquantes par colonne est : ")
+    for nom_col, col in zip(table.column_names, table.columns):
+        print(f"{nom_col:<35} {col.null_count}")
+    print(f"=============== Fin de l'inspection des donnees sur {nom_table} =================\n\n")
+
+    return True
+
+
+# ============================================================================
+# PARTIE 1 ter: INSPECTION RAPIDE (sans charger les tables)
+# ============================================================================
+# Metadonnees des sources (taille, date, nombre de lignes) deja calculees
+METADONNEES_SOURCES = os.path.join(CACHE_ARROW_DIR, 'sources.json')
+
+# Nombre de lignes utilisees pour estimer les types des colonnes
+TAILLE_ECHANTILLON = 1000
+
+
+def compter_lignes_csv(chemin: str) -> int:
+    """
+    Compte les lignes de donnees d'un CSV par blocs binaires, sans le parser
+
+    :param chemin: Le chemin du fichier csv
+    :return: Le nombre de lignes (hors en-tete)
+    """
+    nb_sauts = 0
+    guillemets = False
+    dernier_bloc = b''
+
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            nb_sauts += bloc.count(b'\n')
+            guillemets = guillemets or b'"' in bloc
+            dernier_bloc = bloc
+
+    # Des champs entre guillemets peuvent contenir des sauts de ligne
+    if guillemets:
+        with open(chemin, newline='', encoding='utf-8') as f:
+            return sum(1 for _ in csv.reader(f)) - 1
+
+    if dernier_bloc and not dernier_bloc.endswith(b'\n'):
+        nb_sauts += 1
+
+    return nb_sauts - 1
+
+
+def nombre_lignes_source(chemin: str) -> int:
+    """
+    Nombre de lignes d'une source, relu depuis les metadonnees si le fichier
+    n'a pas change (taille et date identiques)
+
+    :param chemin: Le chemin du fichier csv
+    :return: Le nombre de lignes (hors en-tete)
+    """
+    signature = signature_fichier(chemin)
+
+    metadonnees = {}
+    if os.path.exists(METADONNEES_SOURCES):
+        with open(METADONNEES_SOURCES) as f:
+            metadonnees = json.load(f)
+
+    entree = metadonnees.get(chemin)
+    if entree and entree['signature'] == signature:
+        return entree['nb_lignes']
+
+    nb_lignes = compter_lignes_csv(chemin)
+    metadonnees[chemin] = {'signature': signature, 'nb_lignes': nb_lignes}
+    os.makedirs(os.path.dirname(METADONNEES_SOURCES), exist_ok=True)
+    with open(METADONNEES_SOURCES, 'w') as f:
+        json.dump(metadonnees, f, indent=2)
+
+    return nb_lignes
+
+
+def estimer_type(valeurs: list[str]) -> str:
+    """
+    Estime le type pandas d'une colonne a partir d'un echantillon
+
+    :param valeurs: Les valeurs (texte) de l'echantillon
+    :return: Le nom du type estime
+    """
+    presentes = [v for v in valeurs if v != '']
+    if not presentes:
+        return 'float64'
+
+    for convertir, nom_type in [(int, 'int64'), (float, 'float64')]:
+        try:
+            for v in presentes:
+                convertir(v)
+        except ValueError:
+            continue
+        # Les entiers avec des valeurs manquantes deviennent des float
+        if nom_type == 'int64' and len(presentes) < len(valeurs):
+            return 'float64'
+        return nom_type
+
+    return 'object'
+
+
+def inspecter_source_rapide(file_name: str, head=5) -> bool:
+    """
+    Docstring for inspecter_source_rapide
+    Inspecter une source sans la charger : depuis le cache Arrow s'il est a
+    jour, sinon directement depuis l'en-tete et les premieres lignes du CSV
+
+    :param file_name: Le nom de la table source
+    :param head: Le nombre de lignes a afficher
+    :return: True si la source a ete trouvee
+    """
+    chemin = os.path.join(SOURCES_DIR, f'{file_name}.csv')
+
+    if not os.path.exists(chemin):
+        return False
+    if cache_arrow_a_jour(file_name, 'extract', metadonnees_source(file_name)):
+        return inspecter_table_arrow(file_name, 'extract', head)
+
+    with open(chemin, newline='', encoding='utf-8') as f:
+        lecteur = csv.reader(f)
+        colonnes = next(lecteur)
+        echantillon = [ligne for _, ligne in zip(range(TAILLE_ECHANTILLON), lecteur)]
+
+    # Meme traitement que read_csv_file pour la colonne 'index'
+    debut = 1 if colonnes and colonnes[0] == 'index' else 0
+    colonnes = colonnes[debut:]
+    echantillon = [ligne[debut:] for ligne in echantillon]
+
+    print(f"=============== Inspecter les donnees de {file_name} (apercu rapide) =================")
+    print(f"La dimension du fichier est : {(nombre_lignes_source(chemin), len(colonnes))}")
+    print(f"Les types de donnees (estimes sur {len(echantillon)} lignes) sont : ")
+    for i, col in enumerate(colonnes):
+        print(f"{col:<35} {estimer_type([ligne[i] for ligne in echantillon if i < len(ligne)])}")
+    print(f"Les {head} premieres lignes du fichier sont : ")
+    _afficher_lignes(colonnes, echantillon[:head])
+    print("Valeurs manquantes : chargez les donnees (Option 1) pour le detail.")
+    print(f"=============== Fin de l'inspection des donnees sur {file_name} =================\n\n")
+
+    return True
+
+
 def parser_date(X: pd.Series) -> pd.Series:
     """
     Docstring for parser_date
@@ -356,6 +766,29 @@ def analyser_commandes_paiements(orders: pd.DataFrame, payments: pd.DataFrame) -
     return df_merged, df_missing_payment
 
 
+def ajouter_colonnes_calculees(fact: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute les colonnes calculees necessaires aux metriques
+    (item_total, year_month, delivery_days)
+
+    :param fact: La table de faits order_items
+    :return: La table de faits enrichie
+    """
+    # ajout de  item total: revenu total par article
+    fact['item_total'] = fact['price'] + fact['freight_value']
+    # transforme le la date complete en mois pour les analyses mensuelles
+    # exp: 2026/02
+    fact['year_month'] = fact['order_purchase_timestamp'].dt.to_period('M').astype(str)
+    
+    # calcul delai de livraison (date livraison - date commande)
+    if 'order_delivered_customer_date' in fact.columns:
+        fact['delivery_days'] = (
+            fact['order_delivered_customer_date'] - fact['order_purchase_timestamp']
+        ).dt.days
+
+    return fact
+
+
 def create_fact_order_items_table(data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
     """
     Cree la table de faits en joignant order_items avec les dimensions
@@ -396,20 +829,9 @@ def create_fact_order_items_table(data: dict[str, pd.DataFrame]) -> dict[str, pd
         fact = fact.merge(data[table], on=key, how='outer')
     
     # Calculs necessaire pour calculer les metriques
-    # print("\nCALCULS DES METRIQUES")
-    # ajout de  item total: revenu total par article
-
-    fact['item_total'] = fact['price'] + fact['freight_value']
-    # transforme le la date complete en mois pour les analyses mensuelles
-    # exp: 2026/02
-    fact['year_month'] = fact['order_purchase_timestamp'].dt.to_period('M').astype(str)
+    fact = ajouter_colonnes_calculees(fact)
     
-    # calcul delai de livraison (date livraison - date commande)
-    if 'order_delivered_customer_date' in fact.columns:
-        fact['delivery_days'] = (
-            fact['order_delivered_customer_date'] - fact['order_purchase_timestamp']
-        ).dt.days
-        
+    if 'delivery_days' in fact.columns:
         print(f"\nStatistiques de livraison:")
         print(f"Moyenne: {fact['delivery_days'].mean():.1f} jours")
         print(f"Mediane: {fact['delivery_days'].median():.1f} jours")
@@ -514,101 +936,298 @@ def create_fact_customers_geoloc_table(data: dict[str, pd.DataFrame]) -> dict[st
     return data
 
 
-def calculer_metriques(data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+def metrique_monthly_revenue(fact: pd.DataFrame) -> pd.DataFrame:
+    """
+    T3: Chiffre d'affaires par mois
+
+    :param fact: La table de faits (year_month, item_total)
+    """
+    # Groupe par mois et somme les revenus
+    monthly_revenue = fact.groupby('year_month')['item_total'].sum().reset_index()
+    monthly_revenue.columns = ['year_month', 'revenue_total']
+    # Convertit year_month en string pour pouvoir sauvegarder en CSV
+    monthly_revenue['year_month'] = monthly_revenue['year_month'].astype(str)
+
+    return monthly_revenue
+
+
+def metrique_top_categories(fact: pd.DataFrame) -> pd.DataFrame:
+    """
+    T4: Top 10 categories par revenu
+
+    :param fact: La table de faits (product_category_name, item_total)
+    """
+    # Groupe par categorie et somme les revenus
+    top_categories = fact.groupby('product_category_name')['item_total'].sum().reset_index()
+    top_categories.columns = ['product_category', 'revenue']
+    # Trie par revenu decroissant et prend les 10 premiers
+    return top_categories.sort_values('revenue', ascending=False).head(10)
+
+
+def metrique_delivery_metrics(fact: pd.DataFrame) -> pd.DataFrame:
+    """
+    T5: Delais de livraison moyens par mois
+
+    :param fact: La table de faits (year_month, delivery_days)
+    """
+    # Filtre les lignes avec delai de livraison valide
+    fact_with_delivery = fact[fact['delivery_days'].notna()]
+
+    # Calcule la moyenne des delais par mois
+    delivery_metrics = fact_with_delivery.groupby('year_month')['delivery_days'].mean().reset_index()
+    delivery_metrics.columns = ['year_month', 'avg_delivery_days']
+    delivery_metrics['year_month'] = delivery_metrics['year_month'].astype(str)
+
+    return delivery_metrics
+
+
+def metrique_reviews_monthly(reviews: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    BONUS: Note moyenne des avis par mois
+
+    :param reviews: La table order_reviews (order_id, review_score, review_creation_date)
+    :param orders: La table orders (order_id)
+    """
+    orders_ids = orders['order_id'].unique()
+
+    # Vérification d'intégrité (les orphelins sont comptes dans calculer_metriques)
+    avis_valides = reviews[reviews['order_id'].isin(orders_ids)].copy()
+
+    # Calcul avec la date des avis
+    avis_valides['year_month'] = avis_valides['review_creation_date'].dt.to_period('M').astype(str)
+
+    return avis_valides.groupby('year_month').agg(
+        avg_review_score=('review_score', 'mean'),
+        review_count=('review_score', 'count')
+    ).reset_index()
+
+
+# Format: (nom, titre, fonction, [(table, colonnes utilisees), ...])
+# Seules les colonnes declarees entrent dans l'empreinte du cache
+METRIQUES = [
+    ('monthly_revenue', "T3 - Chiffre d'affaires par mois", metrique_monthly_revenue,
+     [('fact_order_items', ['year_month', 'item_total'])]),
+    ('top_categories', "T4 - Top catégories par revenu.", metrique_top_categories,
+     [('fact_order_items', ['product_category_name', 'item_total'])]),
+    ('delivery_metrics', "T5 - Temps de livraison moyen", metrique_delivery_metrics,
+     [('fact_order_items', ['year_month', 'delivery_days'])]),
+    ('reviews_monthly', "Score moyen des avis par mois", metrique_reviews_monthly,
+     [('order_reviews', ['order_id', 'review_score', 'review_creation_date']), ('orders', ['order_id'])]),
+]
+
+# Cache des metriques adresse par empreinte (LRU borne en taille sur disque)
+CACHE_METRIQUES_DIR = os.path.join(CACHE_ARROW_DIR, 'metriques')
+TAILLE_MAX_CACHE_METRIQUES = 64 * 1024 * 1024  # octets
+STATS_CACHE_METRIQUES = os.path.join(CACHE_METRIQUES_DIR, 'stats.json')
+
+
+def empreinte_sources(metadonnees: dict[str, dict[str, str] | None]) -> str:
+    """
+    Empreinte amont des donnees : signatures des CSV sources (celles
+    enregistrees dans le cache Arrow 'extract') et code du pipeline.
+    Calculee sans lire les donnees.
+
+    :param metadonnees: Les metadonnees de chaque source (metadonnees_source())
+    :return: L'empreinte hexadecimale, ou '' si une source est absente
+        (provenance inconnue : le contenu sera hache)
+    """
+    if any(meta is None for meta in metadonnees.values()):
+        return ''
+
+    with open(__file__, 'rb') as f:
+        h = hashlib.sha256(f.read())
+    h.update(json.dumps(metadonnees, sort_keys=True).encode())
+
+    return h.hexdigest()
+
+
+def _empreinte_colonne(serie: pd.Series) -> bytes:
+    """
+    Empreinte du contenu d'une colonne (nom, type et valeurs)
+
+    :param serie: La colonne
+    :return: Le digest
+    """
+    h = hashlib.sha256(f'{serie.name}:{serie.dtype}'.encode())
+    h.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+    return h.digest()
+
+
+def empreinte_metrique(fonction, entrees: list, data: dict[str, pd.DataFrame],
+                       empreinte_amont: str = '', empreintes_colonnes: dict | None = None) -> str:
+    """
+    Empreinte d'une metrique : definition (code source) + colonnes d'entree.
+    Avec une empreinte amont (empreinte_sources), aucune donnee n'est lue ;
+    sinon le contenu des colonnes est hache, une seule fois par colonne.
+
+    :param fonction: La fonction de calcul de la metrique
+    :param entrees: Les entrees declarees [(table, colonnes), ...]
+    :param data: Le dictionnaire de DataFrames
+    :param empreinte_amont: L'empreinte des sources, ou '' si inconnue
+    :param empreintes_colonnes: Les empreintes deja calculees {(table, colonne): digest}
+    :return: L'empreinte hexadecimale
+    """
+    h = hashlib.sha256(inspect.getsource(fonction).encode())
+    h.update(repr(entrees).encode())
+
+    if empreinte_amont:
+        h.update(empreinte_amont.encode())
+        return h.hexdigest()
+
+    if empreintes_colonnes is None:
+        empreintes_colonnes = {}
+    for table, cols in entrees:
+        for col in cols:
+            if (table, col) not in empreintes_colonnes:
+                empreintes_colonnes[(table, col)] = _empreinte_colonne(data[table][col])
+            h.update(empreintes_colonnes[(table, col)])
+
+    return h.hexdigest()
+
+
+def statistiques_cache_metriques() -> dict:
+    """
+    Statistiques cumulees du cache des metriques (toutes executions)
+
+    :return: {'hits': ..., 'misses': ..., 'par_metrique': {nom: {'hits', 'misses'}}}
+    """
+    if os.path.exists(STATS_CACHE_METRIQUES):
+        with open(STATS_CACHE_METRIQUES) as f:
+            return json.load(f)
+    return {'hits': 0, 'misses': 0, 'par_metrique': {}}
+
+
+def _enregistrer_stat_cache(nom: str, resultat: str) -> None:
+    """
+    Ajoute un hit ou un miss aux statistiques cumulees
+
+    :param nom: Le nom de la metrique
+    :param resultat: 'hits' ou 'misses'
+    """
+    stats = statistiques_cache_metriques()
+    stats[resultat] += 1
+    stats['par_metrique'].setdefault(nom, {'hits': 0, 'misses': 0})[resultat] += 1
+
+    os.makedirs(CACHE_METRIQUES_DIR, exist_ok=True)
+    with open(STATS_CACHE_METRIQUES, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+
+def _evincer_cache_metriques(taille_max: int = TAILLE_MAX_CACHE_METRIQUES) -> None:
+    """
+    Supprime les resultats les moins recemment utilises au-dela de taille_max
+
+    :param taille_max: La taille maximale du cache en octets
+    """
+    fichiers = [
+        os.path.join(CACHE_METRIQUES_DIR, f)
+        for f in os.listdir(CACHE_METRIQUES_DIR) if f.endswith('.pkl')
+    ]
+    # La date de modification sert de date de dernier acces (mise a jour a chaque hit)
+    fichiers.sort(key=os.path.getmtime)
+    taille = sum(os.path.getsize(f) for f in fichiers)
+
+    for chemin in fichiers:
+        if taille <= taille_max:
+            break
+        taille -= os.path.getsize(chemin)
+        os.remove(chemin)
+
+
+def calculer_metrique_en_cache(nom: str, fonction, entrees: list, data: dict[str, pd.DataFrame],
+                               empreinte_amont: str = '', empreintes_colonnes: dict | None = None) -> tuple[pd.DataFrame, bool]:
+    """
+    Docstring for calculer_metrique_en_cache
+    Calcule une metrique ou la relit du cache si ses entrees et sa
+    definition n'ont pas change
+
+    :param nom: Le nom de la metrique
+    :param fonction: La fonction de calcul
+    :param entrees: Les entrees declarees [(table, colonnes), ...]
+    :param data: Le dictionnaire de DataFrames
+    :param empreinte_amont: L'empreinte des sources, ou '' si inconnue
+    :param empreintes_colonnes: Les empreintes de colonnes deja calculees
+    :return: (Le resultat, True si lu depuis le cache)
+    """
+    empreinte = empreinte_metrique(fonction, entrees, data, empreinte_amont, empreintes_colonnes)
+    chemin = os.path.join(CACHE_METRIQUES_DIR, f'{nom}-{empreinte}.pkl')
+
+    if os.path.exists(chemin):
+        os.utime(chemin)
+        _enregistrer_stat_cache(nom, 'hits')
+        return pd.read_pickle(chemin), True
+
+    resultat = fonction(*[data[table][cols] for table, cols in entrees])
+    _enregistrer_stat_cache(nom, 'misses')
+
+    # Ecriture atomique puis eviction LRU
+    chemin_tmp = chemin + '.tmp'
+    resultat.to_pickle(chemin_tmp)
+    os.replace(chemin_tmp, chemin)
+    _evincer_cache_metriques()
+
+    return resultat, False
+
+
+def calculer_metriques(data: dict[str, pd.DataFrame], empreinte_amont: str = '') -> dict[str, pd.DataFrame]:
     """
     Calcule les metriques d'agregation demandees
     
     :param data: dictionnaire de DataFrames
+    :param empreinte_amont: empreinte des sources (empreinte_sources) si les
+        donnees viennent directement des sources, sinon '' (hachage du contenu)
     :return: dictionnaire avec les metriques ajoutees
     """
     print("\n" + "="*50)
     print("TRANSFORMATION: Calcul des metriques")
     print("="*50)
-    
-    # T3: Chiffre d'affaires par mois
-    if 'fact_order_items' in data:
-        fact = data['fact_order_items']
-        
-        # Groupe par mois et somme les revenus
-        monthly_revenue = fact.groupby('year_month')['item_total'].sum().reset_index()
-        monthly_revenue.columns = ['year_month', 'revenue_total']
-        # Convertit year_month en string pour pouvoir sauvegarder en CSV
-        monthly_revenue['year_month'] = monthly_revenue['year_month'].astype(str)
-        
-        data['monthly_revenue'] = monthly_revenue
-        print(f"\nT3 - Chiffre d'affaires par mois : {monthly_revenue.shape}")
-        print("-"*50)
 
-        print(monthly_revenue.head())
-    
-    
-    # T4: Top 10 categories par revenu
-    # if 'fact_order_items' in data:
-        fact = data['fact_order_items']
-        
-        # Groupe par categorie et somme les revenus
-        top_categories = fact.groupby('product_category_name')['item_total'].sum().reset_index()
-        top_categories.columns = ['product_category', 'revenue']
-        # Trie par revenu decroissant et prend les 10 premiers
-        top_categories = top_categories.sort_values('revenue', ascending=False).head(10)
-        
-        data['top_categories'] = top_categories
-        print(f"\nT4 - Top catégories par revenu.: {top_categories.shape}")
-        print("-"*50)
-        print(top_categories.head())
-    
-        # T5: Delais de livraison moyens par mois
-        if 'fact_order_items' in data and 'delivery_days' in data['fact_order_items'].columns:
-            fact = data['fact_order_items']
-            
-            # Filtre les lignes avec delai de livraison valide
-            fact_with_delivery = fact[fact['delivery_days'].notna()]
-            
-            # Calcule la moyenne des delais par mois
-            delivery_metrics = fact_with_delivery.groupby('year_month')['delivery_days'].mean().reset_index()
-            delivery_metrics.columns = ['year_month', 'avg_delivery_days']
-            delivery_metrics['year_month'] = delivery_metrics['year_month'].astype(str)
-            
-            data['delivery_metrics'] = delivery_metrics
-            print(f"\nT5 - Temps de livraison moyen: {delivery_metrics.shape}")
-            print("-"*50)
-
-            print(delivery_metrics.head())
-        
-        # BONUS: Note moyenne des avis par mois (version compacte)
-        if 'order_reviews' in data and 'orders' in data:
-            reviews = data['order_reviews'].copy()
-            orders_ids = data['orders']['order_id'].unique()
-            
-            # Vérification d'intégrité
-            avis_valides = reviews[reviews['order_id'].isin(orders_ids)]
-            nb_orphelins = len(reviews) - len(avis_valides)
-            
-            if nb_orphelins > 0:
-                print(f"{nb_orphelins} avis orphelins exclus")
-            
-            # Calcul avec la date des avis
-            if 'review_creation_date' in avis_valides.columns:
-                avis_valides['year_month'] = avis_valides['review_creation_date'].dt.to_period('M').astype(str)
-                
-                data['reviews_monthly'] = avis_valides.groupby('year_month').agg(
-                    avg_review_score=('review_score', 'mean'),
-                    review_count=('review_score', 'count')
-                ).reset_index()
-                
-                print(f"\nScore moyen des avis par mois: {data['reviews_monthly'].shape}")
-                print("-" * 50)
-                print(data['reviews_monthly'].head())
-    else: 
+    if 'fact_order_items' not in data:
         print("veuillez d'abord construire le jeu de faits")
         return data
+
+    # Avis orphelins comptes hors du cache pour que le message reste affiche
+    if 'order_reviews' in data and 'orders' in data:
+        nb_orphelins = (~data['order_reviews']['order_id'].isin(data['orders']['order_id'])).sum()
+        if nb_orphelins > 0:
+            print(f"{nb_orphelins} avis orphelins exclus")
+
+    hits = 0
+    evaluees = 0
+    empreintes_colonnes = {}
+    for nom, titre, fonction, entrees in METRIQUES:
+        # Metrique ignoree si une table ou une colonne d'entree manque
+        if any(table not in data or not set(cols) <= set(data[table].columns) for table, cols in entrees):
+            continue
+
+        df, depuis_cache = calculer_metrique_en_cache(nom, fonction, entrees, data, empreinte_amont, empreintes_colonnes)
+        hits += depuis_cache
+        evaluees += 1
+
+        data[nom] = df
+        print(f"\n{titre}: {df.shape}" + (" (cache)" if depuis_cache else ""))
+        print("-"*50)
+        print(df.head())
+
+    stats = statistiques_cache_metriques()
+    print(f"\nCache des metriques: {hits} resultats relus sur {evaluees} "
+          f"(cumul: {stats['hits']} hits, {stats['misses']} misses)")
+
+    # Sketches fusionnables (percentiles de livraison, comptes distincts) :
+    # seules les commandes absentes de l'etat persiste sont lues
+    etat = charger_sketches(data['fact_order_items']['order_id'], empreinte_amont)
+    nouveau = nouvelles_commandes(data['fact_order_items'], etat)
+    sketches = mettre_a_jour_sketches(etat, construire_sketches(nouveau), commandes_vues(nouveau), empreinte_amont)
+    data = ajouter_sketches(data, sketches)
+
     return data
-            
-            
-def transform_data(dfs: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+
+
+def nettoyer_donnees(dfs: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
     """
-    Docstring for transform
-    Transformer les donnees sources pour les rendre plus propres
+    Docstring for nettoyer_donnees
+    Nettoyer les donnees sources (dates, doublons, colonnes inutiles, NaN)
+    avant la construction des faits
     """
 
     # Transformer les colonnes de date en format datetime
@@ -627,20 +1246,901 @@ def transform_data(dfs: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
         if df.isna().sum().sum() > 0:
             # Gerer les valeurs manquantes
             dfs[table_name] = gerer_valeurs_manquantes(df, table_name)
-    
-    # Creer et ajouter le jeu de faits
-    dfs = create_fact_order_items_table(data=dfs)
-    dfs = create_fact_customers_geoloc_table(data=dfs)
-    
-    #calculer les metriques
-    
-    dfs = calculer_metriques(data= dfs)
 
     return dfs
 
-# ============================================================================
-# PARTIE 3: FONCTIONS DE CHARGEMENT
-# ============================================================================
+
+def nettoyer_donnees_en_cache(dfs: dict[str, pd.DataFrame], empreinte_amont: str = '') -> dict[str, pd.DataFrame]:
+    """
+    Nettoyer les donnees, ou relire les tables nettoyees depuis le cache
+    Arrow 'clean' s'il a ete ecrit pour les memes sources et le meme code
+
+    :param dfs: Le dictionnaire de dataframes sources
+    :param empreinte_amont: L'empreinte des sources chargees, ou '' si
+        inconnue (pas de cache)
+    :return: Le dictionnaire de dataframes nettoyes
+    """
+    if not empreinte_amont:
+        return nettoyer_donnees(dfs)
+
+    metadonnees = {nom_table: {'empreinte_amont': empreinte_amont} for nom_table in dfs}
+    if all(cache_arrow_a_jour(nom_table, 'clean', attendu) for nom_table, attendu in metadonnees.items()):
+        nettoyees = charger_cache_arrow('clean', metadonnees)
+        if nettoyees:
+            print("Donnees nettoyees relues depuis le cache Arrow.")
+            return nettoyees
+
+    dfs = nettoyer_donnees(dfs)
+    sauvegarder_cache_arrow(dfs, 'clean', metadonnees)
+    return dfs
+
+
+def transform_data(dfs: dict[str, pd.DataFrame], empreinte_amont: str = '') -> dict[str, pd.DataFrame]:
+    """
+    Docstring for transform
+    Transformer les donnees sources pour les rendre plus propres
+
+    :param empreinte_amont: L'empreinte des sources chargees (caches clean et metriques)
+    """
+    dfs = nettoyer_donnees_en_cache(dfs, empreinte_amont)
+    
+    # Creer et ajouter le jeu de faits
+    dfs = create_fact_order_items_table(data=dfs)
+    dfs = create_fact_customers_geoloc_table(data=dfs)
+    
+    #calculer les metriques
+    
+    dfs = calculer_metriques(data= dfs, empreinte_amont=empreinte_amont)
+
+    return dfs
+
+# ============================================================================
+# PARTIE 2 bis: TRANSFORMATION PARALLELE PAR SHARDS (hash de order_id)
+# ============================================================================
+# Tables partitionnees par hash de order_id : toutes les lignes d'une meme
+# commande se retrouvent dans le meme shard
+TABLES_PAR_COMMANDE = ['order_items', 'orders', 'order_pymts', 'order_reviews']
+
+# Dimensions jointes a la table de faits (table, cle de jointure)
+JOINTURES_DIMENSIONS = [
+    ('customers', 'customer_id'),
+    ('sellers', 'seller_id'),
+    ('products', 'product_id'),
+]
+
+# Donnees partagees en lecture seule avec les workers (dimensions et etat des
+# sketches) : heritees par fork (copy-on-write) ou recues une seule fois par
+# worker via l'initializer
+_DONNEES_PARTAGEES: dict = {}
+
+
+def _contexte_processus():
+    """
+    Contexte multiprocessing : fork uniquement sous Linux, ailleurs le
+    contexte par defaut (spawn sous macOS et Windows, fork y est dangereux)
+
+    :return: Le contexte multiprocessing
+    """
+    import multiprocessing as mp
+
+    if sys.platform.startswith('linux'):
+        return mp.get_context('fork')
+    return mp.get_context()
+
+
+def _init_worker_shard(partage: dict) -> None:
+    """
+    Initialise un worker en mode spawn avec les donnees partagees
+
+    :param partage: Les tables de dimensions et l'etat des sketches
+    """
+    global _DONNEES_PARTAGEES
+    _DONNEES_PARTAGEES = partage
+
+
+def partitionner_par_order_id(dfs: dict[str, pd.DataFrame], nb_shards: int) -> list[dict[str, pd.DataFrame]]:
+    """
+    Partitionne les tables de commandes par hash de order_id
+
+    :param dfs: Le dictionnaire de dataframes nettoyes
+    :param nb_shards: Le nombre de shards
+    :return: Une liste de dictionnaires (un par shard)
+    """
+    shards = [{} for _ in range(nb_shards)]
+
+    for table in TABLES_PAR_COMMANDE:
+        df = dfs[table]
+        # Meme fonction de hash pour toutes les tables -> meme shard par commande
+        num_shard = pd.util.hash_pandas_object(df['order_id'], index=False).to_numpy() % nb_shards
+
+        for shard in shards:
+            shard[table] = df.iloc[0:0]
+        for num, part in df.groupby(num_shard):
+            shards[num][table] = part
+
+    return shards
+
+
+def _construire_shard(shard: dict[str, pd.DataFrame]) -> tuple[pd.DataFrame, dict, pd.DataFrame, int]:
+    """
+    Construit la table de faits partielle et les agregats partiels d'un shard
+    (execute dans un worker)
+
+    :param shard: Les tables de commandes du shard
+    :return: (faits partiels, agregats partiels, orders_payments partiel, nb avis orphelins)
+    """
+    orders = shard['orders']
+
+    fact = shard['order_items'].merge(orders, on='order_id', how='outer')
+    for table, key in JOINTURES_DIMENSIONS:
+        # Jointure gauche : les lignes de dimension sans fait sont ajoutees a la fusion
+        fact = fact.merge(_DONNEES_PARTAGEES[table], on=key, how='left')
+    fact = ajouter_colonnes_calculees(fact)
+
+    partiels = {
+        'monthly_revenue': fact.groupby('year_month')['item_total'].sum(),
+        'top_categories': fact.groupby('product_category_name')['item_total'].sum(),
+    }
+
+    if 'delivery_days' in fact.columns:
+        fact_with_delivery = fact[fact['delivery_days'].notna()]
+        partiels['delivery_metrics'] = fact_with_delivery.groupby('year_month')['delivery_days'].agg(['sum', 'count'])
+
+    # Les avis d'une commande sont dans le meme shard que la commande
+    reviews = shard['order_reviews']
+    avis_valides = reviews[reviews['order_id'].isin(orders['order_id'])].copy()
+    nb_orphelins = len(reviews) - len(avis_valides)
+    if 'review_creation_date' in avis_valides.columns:
+        avis_valides['year_month'] = avis_valides['review_creation_date'].dt.to_period('M').astype(str)
+        partiels['reviews_monthly'] = avis_valides.groupby('year_month')['review_score'].agg(['sum', 'count'])
+
+    # Sketches des seules commandes absentes de l'etat persiste
+    nouveau = nouvelles_commandes(fact, _DONNEES_PARTAGEES['etat_sketches'])
+    partiels['sketches'] = construire_sketches(nouveau)
+    partiels['sketch_orders'] = commandes_vues(nouveau)
+
+    orders_payments = pd.merge(orders, shard['order_pymts'], on='order_id', how='outer', indicator=True)
+
+    return fact, partiels, orders_payments, nb_orphelins
+
+
+def _lignes_dimension_sans_fait(fact: pd.DataFrame, dim: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Construit les lignes d'une dimension absentes de la table de faits, avec
+    les colonnes et les colonnes calculees qu'aurait donnees la jointure externe
+
+    :param fact: La table de faits assemblee
+    :param dim: La table de dimension
+    :param key: La cle de jointure
+    :return: Les lignes a ajouter a la table de faits
+    """
+    orphelines = dim[~dim[key].isin(fact[key])]
+
+    # reindex sur une table vide garde les types des colonnes (NaT pour les dates)
+    lignes = fact.iloc[0:0].reindex(pd.RangeIndex(len(orphelines)))
+    for col in orphelines.columns:
+        lignes[col] = orphelines[col].to_numpy()
+
+    return ajouter_colonnes_calculees(lignes)
+
+
+def fusionner_agregats_partiels(partiels: list[dict]) -> dict[str, pd.DataFrame]:
+    """
+    Fusionne les agregats partiels des shards en metriques finales
+
+    :param partiels: La liste des agregats partiels (un dict par shard)
+    :return: Le dictionnaire des metriques (monthly_revenue, top_categories, ..., sketches)
+    """
+    def concat(nom):
+        parts = [p[nom] for p in partiels if nom in p]
+        return pd.concat(parts).groupby(level=0).sum() if parts else None
+
+    metriques = {}
+
+    revenue = concat('monthly_revenue')
+    monthly_revenue = revenue.reset_index()
+    monthly_revenue.columns = ['year_month', 'revenue_total']
+    metriques['monthly_revenue'] = monthly_revenue
+
+    categories = concat('top_categories')
+    top_categories = categories.reset_index()
+    top_categories.columns = ['product_category', 'revenue']
+    metriques['top_categories'] = top_categories.sort_values('revenue', ascending=False).head(10)
+
+    delivery = concat('delivery_metrics')
+    if delivery is not None:
+        delivery_metrics = (delivery['sum'] / delivery['count']).reset_index()
+        delivery_metrics.columns = ['year_month', 'avg_delivery_days']
+        metriques['delivery_metrics'] = delivery_metrics
+
+    reviews = concat('reviews_monthly')
+    if reviews is not None:
+        reviews_monthly = pd.DataFrame({
+            'avg_review_score': reviews['sum'] / reviews['count'],
+            'review_count': reviews['count'],
+        }).rename_axis('year_month').reset_index()
+        metriques['reviews_monthly'] = reviews_monthly
+
+    # Sketches des nouvelles commandes, a integrer dans l'etat persiste
+    metriques.update(fusionner_sketches(*[p['sketches'] for p in partiels]))
+    metriques['sketch_orders'] = pd.concat([p['sketch_orders'] for p in partiels], ignore_index=True)
+
+    return metriques
+
+
+def transform_data_shards(dfs: dict[str, pd.DataFrame], nb_workers: int = 0,
+                          empreinte_amont: str = '') -> dict[str, pd.DataFrame]:
+    """
+    Docstring for transform_data_shards
+    Variante parallele de transform_data : les tables de commandes sont
+    partitionnees par hash de order_id et chaque shard construit ses faits
+    et agregats partiels dans un pool de processus
+
+    Limite : le nettoyage, le partitionnement et l'assemblage des faits
+    (renvoyes au parent par pickle) restent sequentiels. Seules les jointures
+    et les agregats sont paralleles, le gain est donc borne par cette partie
+    sequentielle et n'est pas lineaire en nombre de coeurs.
+
+    :param dfs: Le dictionnaire de dataframes sources
+    :param nb_workers: Le nombre de processus (0: nombre de coeurs)
+    :param empreinte_amont: L'empreinte des sources chargees (cache clean, sketches)
+    :return: Le dictionnaire avec les faits et metriques
+    """
+    global _DONNEES_PARTAGEES
+
+    dfs = nettoyer_donnees_en_cache(dfs, empreinte_amont)
+
+    print("\n" + "="*50)
+    print("TRANSFORMATION PARALLELE: Construction par shards")
+    print("="*50)
+
+    tables_requises = TABLES_PAR_COMMANDE + [t for t, _ in JOINTURES_DIMENSIONS]
+    missing = [t for t in tables_requises if t not in dfs]
+    if missing:
+        print(f"ERREUR: Tables manquantes: {missing}")
+        return dfs
+
+    nb_workers = nb_workers or os.cpu_count() or 1
+    etat = charger_sketches(pd.concat([dfs['orders']['order_id'], dfs['order_items']['order_id']]), empreinte_amont)
+    partage = {table: dfs[table] for table, _ in JOINTURES_DIMENSIONS}
+    # Seule la liste des commandes integrees est utile aux workers
+    partage['etat_sketches'] = None if etat is None else {'sketch_orders': etat['sketch_orders']}
+    shards = partitionner_par_order_id(dfs, nb_workers)
+    print(f"{nb_workers} shards: {[len(shard['order_items']) for shard in shards]} lignes order_items")
+
+    # Avec fork, les workers heritent des donnees partagees sans serialisation
+    contexte = _contexte_processus()
+    if contexte.get_start_method() == 'fork':
+        _DONNEES_PARTAGEES = partage
+        pool = contexte.Pool(nb_workers)
+    else:
+        pool = contexte.Pool(nb_workers, initializer=_init_worker_shard, initargs=(partage,))
+
+    try:
+        with pool:
+            resultats = pool.map(_construire_shard, shards)
+    finally:
+        _DONNEES_PARTAGEES = {}
+
+    facts, partiels, orders_payments, orphelins = zip(*resultats)
+
+    # Assemblage de la table de faits
+    fact = pd.concat(facts, ignore_index=True)
+    # Lignes de dimension sans fait (equivalent de la jointure externe)
+    for table, key in JOINTURES_DIMENSIONS:
+        fact = pd.concat([fact, _lignes_dimension_sans_fait(fact, dfs[table], key)], ignore_index=True)
+
+    if 'delivery_days' in fact.columns:
+        print("\nStatistiques de livraison:")
+        print(f"Moyenne: {fact['delivery_days'].mean():.1f} jours")
+        print(f"Mediane: {fact['delivery_days'].median():.1f} jours")
+        print(f"Min: {fact['delivery_days'].min():.1f} jours")
+        print(f"Max: {fact['delivery_days'].max():.1f} jours")
+
+    dfs['fact_order_items'] = fact
+    print(f"\nTable de faits finale: {fact.shape}")
+
+    # Tables d'analyse de qualite
+    print("\n--- RELATION COMMANDES - CLIENTS ---")
+    dfs['orders_customers'] = analyser_commandes_clients(dfs['orders'], dfs['customers'])
+    df_orders_payments = pd.concat(orders_payments, ignore_index=True)
+    dfs['orders_payments'] = df_orders_payments
+    dfs['missing_payments'] = df_orders_payments[df_orders_payments['_merge'] == 'left_only']
+    print(f"\n{len(dfs['missing_payments'])} commandes sans paiement")
+
+    dfs = create_fact_customers_geoloc_table(data=dfs)
+
+    # Fusion des agregats partiels
+    print("\n" + "="*50)
+    print("TRANSFORMATION: Fusion des metriques des shards")
+    print("="*50)
+    if sum(orphelins) > 0:
+        print(f"{sum(orphelins)} avis orphelins exclus")
+
+    metriques = fusionner_agregats_partiels(list(partiels))
+    nouveaux_sketches = {nom: metriques.pop(nom) for nom in ['sketch_delivery', 'sketch_distinct']}
+    sketches = mettre_a_jour_sketches(etat, nouveaux_sketches, metriques.pop('sketch_orders'), empreinte_amont)
+    for nom, df in metriques.items():
+        dfs[nom] = df
+        print(f"\n{nom}: {df.shape}")
+        print("-"*50)
+        print(df.head())
+
+    dfs = ajouter_sketches(dfs, sketches)
+
+    return dfs
+
+
+# ============================================================================
+# PARTIE 2 ter: STATISTIQUES APPROXIMATIVES FUSIONNABLES (SKETCHES)
+# ============================================================================
+# Precision HyperLogLog : 2**HLL_PRECISION registres (erreur relative ~3%)
+HLL_PRECISION = 10
+
+# Quantiles suivis pour les delais de livraison
+QUANTILES_LIVRAISON = {'p50': 0.50, 'p90': 0.90, 'p99': 0.99}
+
+# Portees des sketches : (nom de la portee, colonne de regroupement)
+PORTEES_SKETCHES = [
+    ('year_month', 'year_month'),
+    ('category', 'product_category_name'),
+]
+
+COLONNES_SKETCH_DELIVERY = ['scope', 'key', 'delivery_days', 'count']
+COLONNES_SKETCH_DISTINCT = ['scope', 'key', 'metric', 'registers']
+
+
+def _hll_hash(valeurs: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calcule pour chaque valeur l'indice de registre et le rang HyperLogLog
+
+    :param valeurs: Les identifiants (sans NaN)
+    :return: (indices des registres, rangs)
+    """
+    bits_restants = 64 - HLL_PRECISION
+    h = pd.util.hash_pandas_object(valeurs, index=False).to_numpy()
+
+    idx = (h >> np.uint64(bits_restants)).astype(np.int64)
+    reste = h & np.uint64((1 << bits_restants) - 1)
+    # frexp donne le nombre de bits significatifs du reste (0 pour reste == 0)
+    _, nb_bits = np.frexp(reste.astype(np.float64))
+    rang = (bits_restants - nb_bits + 1).astype(np.uint8)
+
+    return idx, rang
+
+
+def _hll_decoder(registres_hex: str) -> np.ndarray:
+    """Decode des registres HyperLogLog stockes en hexadecimal"""
+    return np.frombuffer(bytes.fromhex(registres_hex), dtype=np.uint8)
+
+
+def _hll_fusionner(registres_hex: pd.Series) -> str:
+    """Fusionne des registres HyperLogLog (maximum registre par registre)"""
+    return np.maximum.reduce([_hll_decoder(r) for r in registres_hex]).tobytes().hex()
+
+
+def _hll_estimation(registres_hex: str) -> float:
+    """
+    Estime le nombre de valeurs distinctes a partir des registres
+
+    :param registres_hex: Les registres en hexadecimal
+    :return: Le nombre estime de valeurs distinctes
+    """
+    registres = _hll_decoder(registres_hex).astype(np.float64)
+    m = registres.size
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimation = alpha * m * m / np.sum(np.power(2.0, -registres))
+
+    # Correction pour les petites cardinalites (linear counting)
+    nb_zeros = np.count_nonzero(registres == 0)
+    if estimation <= 2.5 * m and nb_zeros > 0:
+        estimation = m * np.log(m / nb_zeros)
+
+    return estimation
+
+
+def _sketches_chunk(fact: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Construit les sketches d'un morceau de la table de faits
+
+    :param fact: Un morceau de la table de faits
+    :return: Le dictionnaire des sketches (sketch_delivery, sketch_distinct)
+    """
+    # Uniquement les lignes issues d'une commande
+    fact = fact[fact['order_id'].notna()]
+    col_client = 'customer_unique_id' if 'customer_unique_id' in fact.columns else 'customer_id'
+
+    histogrammes = []
+    distincts = []
+
+    for scope, col in PORTEES_SKETCHES:
+        if col not in fact.columns:
+            continue
+
+        # Histogramme des delais : les delais sont en jours entiers, il est donc
+        # exact et fusionnable par simple somme
+        if 'delivery_days' in fact.columns:
+            livr = fact[fact['delivery_days'].notna()]
+            histo = livr.groupby([col, livr['delivery_days'].astype(np.int64)]).size().reset_index()
+            histo.columns = ['key', 'delivery_days', 'count']
+            histo.insert(0, 'scope', scope)
+            histogrammes.append(histo)
+
+        # HyperLogLog des clients et vendeurs distincts
+        for metric, id_col in [('customers', col_client), ('sellers', 'seller_id')]:
+            valides = fact[fact[col].notna() & fact[id_col].notna()]
+            if valides.empty:
+                continue
+            idx, rang = _hll_hash(valides[id_col])
+            maxi = pd.DataFrame({'key': valides[col].to_numpy(), 'idx': idx, 'rang': rang}).groupby(['key', 'idx'])['rang'].max()
+
+            for key, serie in maxi.groupby(level='key'):
+                registres = np.zeros(2 ** HLL_PRECISION, dtype=np.uint8)
+                registres[serie.index.get_level_values('idx')] = serie.to_numpy()
+                distincts.append((scope, key, metric, registres.tobytes().hex()))
+
+    return {
+        'sketch_delivery': pd.concat(histogrammes, ignore_index=True) if histogrammes
+            else pd.DataFrame(columns=COLONNES_SKETCH_DELIVERY),
+        'sketch_distinct': pd.DataFrame(distincts, columns=COLONNES_SKETCH_DISTINCT),
+    }
+
+
+def fusionner_sketches(*sketches: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """
+    Fusionne plusieurs ensembles de sketches (chunks, shards ou historique)
+
+    :param sketches: Les dictionnaires de sketches a fusionner
+    :return: Le dictionnaire de sketches fusionne
+    """
+    delivery = pd.concat([s['sketch_delivery'] for s in sketches], ignore_index=True)
+    delivery = delivery.groupby(['scope', 'key', 'delivery_days'], as_index=False)['count'].sum()
+
+    distinct = pd.concat([s['sketch_distinct'] for s in sketches], ignore_index=True)
+    distinct = distinct.groupby(['scope', 'key', 'metric'], as_index=False)['registers'].agg(_hll_fusionner)
+
+    return {'sketch_delivery': delivery, 'sketch_distinct': distinct}
+
+
+def construire_sketches(fact: pd.DataFrame, taille_chunk: int = 100_000) -> dict[str, pd.DataFrame]:
+    """
+    Docstring for construire_sketches
+    Construit les sketches par morceaux de la table de faits puis les fusionne
+
+    :param fact: La table de faits order_items
+    :param taille_chunk: Le nombre de lignes par morceau
+    :return: Le dictionnaire des sketches
+    """
+    chunks = [
+        _sketches_chunk(fact.iloc[debut:debut + taille_chunk])
+        for debut in range(0, max(len(fact), 1), taille_chunk)
+    ]
+    return fusionner_sketches(*chunks)
+
+
+# Etat persiste des sketches : sketches cumules, order_id deja vus (final :
+# commande livree, plus jamais relue) et provenance (etat.json)
+ETAT_SKETCHES_DIR = os.path.join(CACHE_ARROW_DIR, 'sketches')
+TABLES_ETAT_SKETCHES = ['sketch_delivery', 'sketch_distinct', 'sketch_orders']
+TYPES_ETAT_SKETCHES = {'key': str, 'registers': str, 'order_id': str, 'final': bool}
+
+
+def _empreinte_definition_sketches() -> str:
+    """Empreinte de la construction des sketches (code et parametres)"""
+    h = hashlib.sha256(repr((HLL_PRECISION, PORTEES_SKETCHES)).encode())
+    for fonction in (_hll_hash, _sketches_chunk, commandes_vues):
+        h.update(inspect.getsource(fonction).encode())
+    return h.hexdigest()
+
+
+def charger_sketches(order_ids: pd.Series, empreinte_amont: str = '',
+                     etat_dir: str = ETAT_SKETCHES_DIR) -> dict[str, pd.DataFrame] | None:
+    """
+    Recharge l'etat persiste des sketches. L'etat est ignore (reconstruction
+    complete) si la construction des sketches a change, ou si les sources ont
+    change autrement que par ajout de commandes (une commande vue a disparu).
+
+    :param order_ids: Les order_id des donnees courantes
+    :param empreinte_amont: L'empreinte des sources chargees, ou '' si inconnue
+    :param etat_dir: Le dossier de l'etat
+    :return: Le dictionnaire de l'etat, ou None s'il faut tout reconstruire
+    """
+    chemins = {nom: os.path.join(etat_dir, f'{nom}.csv') for nom in TABLES_ETAT_SKETCHES}
+    chemin_meta = os.path.join(etat_dir, 'etat.json')
+    if not all(os.path.exists(chemin) for chemin in [*chemins.values(), chemin_meta]):
+        return None
+
+    with open(chemin_meta) as f:
+        meta = json.load(f)
+    if meta.get('definition') != _empreinte_definition_sketches():
+        print("Sketches: construction modifiee, reconstruction complete")
+        return None
+
+    # registers en texte : un hexadecimal sans lettre serait lu comme un entier
+    etat = {nom: pd.read_csv(chemin, dtype=TYPES_ETAT_SKETCHES) for nom, chemin in chemins.items()}
+
+    # Sources inchangees : l'etat correspond exactement aux donnees
+    if empreinte_amont and meta.get('empreinte_sources') == empreinte_amont:
+        return etat
+    if not etat['sketch_orders']['order_id'].isin(order_ids).all():
+        print("Sketches: sources remplacees, reconstruction complete")
+        return None
+    return etat
+
+
+def nouvelles_commandes(fact: pd.DataFrame, etat: dict[str, pd.DataFrame] | None) -> pd.DataFrame:
+    """
+    Lignes de faits des commandes pas encore integrees definitivement dans
+    l'etat (nouvelles ou encore en cours de livraison)
+
+    :param fact: La table de faits (ou un shard)
+    :param etat: L'etat persiste (charger_sketches()), ou None
+    :return: Les lignes a integrer
+    """
+    fact = fact[fact['order_id'].notna()]
+    if etat is None:
+        return fact
+    orders = etat['sketch_orders']
+    return fact[~fact['order_id'].isin(orders.loc[orders['final'], 'order_id'])]
+
+
+def commandes_vues(nouveau: pd.DataFrame) -> pd.DataFrame:
+    """
+    Commandes integrees dans les sketches et leur etat final : une commande
+    livree ne change plus, une commande en cours sera relue au prochain
+    passage (sans double comptage : elle n'a pas de delai de livraison et
+    le HyperLogLog est idempotent)
+
+    :param nouveau: Les lignes integrees (nouvelles_commandes())
+    :return: Le DataFrame (order_id, final), une ligne par commande
+    """
+    if 'order_delivered_customer_date' in nouveau.columns:
+        final = nouveau['order_delivered_customer_date'].notna()
+    elif 'delivery_days' in nouveau.columns:
+        final = nouveau['delivery_days'].notna()
+    else:
+        final = pd.Series(True, index=nouveau.index)
+
+    orders = pd.DataFrame({'order_id': nouveau['order_id'], 'final': final})
+    return orders.groupby('order_id', as_index=False)['final'].max()
+
+
+def mettre_a_jour_sketches(etat: dict[str, pd.DataFrame] | None, sketches: dict[str, pd.DataFrame],
+                           commandes: pd.DataFrame, empreinte_amont: str = '',
+                           etat_dir: str = ETAT_SKETCHES_DIR) -> dict[str, pd.DataFrame]:
+    """
+    Docstring for mettre_a_jour_sketches
+    Integre les sketches des nouvelles commandes dans l'etat persiste, sans
+    relire l'historique
+
+    :param etat: L'etat persiste (charger_sketches()), ou None
+    :param sketches: Les sketches des nouvelles commandes uniquement
+    :param commandes: Les commandes integrees (commandes_vues())
+    :param empreinte_amont: L'empreinte des sources chargees, ou '' si inconnue
+    :param etat_dir: Le dossier de l'etat
+    :return: Les sketches cumules
+    """
+    orders = commandes
+    if etat is not None:
+        sketches = fusionner_sketches(etat, sketches)
+        orders = pd.concat([etat['sketch_orders'], commandes], ignore_index=True)
+        orders = orders.groupby('order_id', as_index=False)['final'].max()
+
+    # Ecriture dans des fichiers temporaires puis remplacement
+    os.makedirs(etat_dir, exist_ok=True)
+    for nom, df in [('sketch_delivery', sketches['sketch_delivery']),
+                    ('sketch_distinct', sketches['sketch_distinct']),
+                    ('sketch_orders', orders)]:
+        chemin = os.path.join(etat_dir, f'{nom}.csv')
+        df.to_csv(chemin + '.tmp', index=False)
+        os.replace(chemin + '.tmp', chemin)
+
+    chemin_meta = os.path.join(etat_dir, 'etat.json')
+    with open(chemin_meta + '.tmp', 'w') as f:
+        json.dump({'definition': _empreinte_definition_sketches(), 'empreinte_sources': empreinte_amont}, f, indent=2)
+    os.replace(chemin_meta + '.tmp', chemin_meta)
+
+    print(f"Sketches: {commandes['final'].sum()} commandes livrees integrees, "
+          f"{(~commandes['final']).sum()} en cours ({orders['final'].sum()} livrees au total)")
+
+    return sketches
+
+
+def resumer_sketches(sketches: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """
+    Docstring for resumer_sketches
+    Calcule les percentiles de livraison et les comptes distincts a partir
+    des sketches
+
+    :param sketches: Le dictionnaire des sketches
+    :return: Les tables delivery_percentiles et distinct_counts
+    """
+    # Percentiles (rang le plus proche) a partir des histogrammes
+    lignes = []
+    delivery = sketches['sketch_delivery'].sort_values(['scope', 'key', 'delivery_days'])
+    for (scope, key), histo in delivery.groupby(['scope', 'key']):
+        cumul = histo['count'].cumsum().to_numpy()
+        jours = histo['delivery_days'].to_numpy()
+        ligne = {'scope': scope, 'key': key, 'count': int(cumul[-1])}
+        for nom, q in QUANTILES_LIVRAISON.items():
+            ligne[nom] = jours[np.searchsorted(cumul, q * cumul[-1])]
+        lignes.append(ligne)
+    delivery_percentiles = pd.DataFrame(lignes, columns=['scope', 'key', 'count'] + list(QUANTILES_LIVRAISON))
+
+    # Comptes distincts approximatifs
+    distinct = sketches['sketch_distinct'].copy()
+    distinct['approx'] = distinct['registers'].map(_hll_estimation).round().astype(np.int64)
+    distinct_counts = distinct.pivot_table(index=['scope', 'key'], columns='metric', values='approx', aggfunc='max', fill_value=0).reset_index()
+    distinct_counts.columns = ['scope', 'key'] + [f'approx_{col}' for col in distinct_counts.columns[2:]]
+
+    return {'delivery_percentiles': delivery_percentiles, 'distinct_counts': distinct_counts}
+
+
+def ajouter_sketches(data: dict[str, pd.DataFrame], sketches: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """
+    Ajoute les sketches et leurs resumes au dictionnaire de tables
+
+    :param data: Le dictionnaire de DataFrames
+    :param sketches: Le dictionnaire des sketches
+    :return: Le dictionnaire avec les sketches ajoutes
+    """
+    data.update(sketches)
+    data.update(resumer_sketches(sketches))
+
+    print(f"\nPercentiles des delais de livraison: {data['delivery_percentiles'].shape}")
+    print("-"*50)
+    print(data['delivery_percentiles'].head())
+    print(f"\nClients et vendeurs distincts (approx.): {data['distinct_counts'].shape}")
+    print("-"*50)
+    print(data['distinct_counts'].head())
+
+    return data
+
+
+# ============================================================================
+# PARTIE 3: FONCTIONS DE CHARGEMENT
+# ============================================================================
+# Taille des files d'attente de chaque destination : au-dela, la preparation
+# des tables suivantes attend la destination la plus lente (contre-pression)
+TAILLE_FILE_SINK = 2
+
+
+def _ouvrir_csv(output_dir: str) -> str:
+    """Cree le dossier CSV s'il n'existe pas"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Dossier '{output_dir}' cree")
+    return output_dir
+
+
+def _ecrire_csv(dossier: str, df: pd.DataFrame, filename: str, table_name: str) -> int:
+    """Ecrit une table en CSV"""
+    df.to_csv(os.path.join(dossier, filename), index=False)
+    print(f" {filename} sauvegarde ({len(df)} lignes)")
+    return len(df)
+
+
+def _fermer_csv(dossier: str) -> None:
+    """Rien a fermer pour le CSV"""
+
+
+def sink_csv(output_dir: str = 'outputs') -> tuple:
+    """
+    Destination CSV pour le chargement. La serialisation CSV est limitee par
+    le CPU : elle s'execute dans son propre processus pour ne pas partager
+    le GIL avec les autres destinations
+
+    :param output_dir: Dossier de sortie
+    :return: Un tuple (nom, ouvrir, ecrire, fermer, args_ouvrir, dans_un_processus)
+    """
+    return ('csv', _ouvrir_csv, _ecrire_csv, _fermer_csv, (output_dir,), True)
+
+
+def _ouvrir_sqlite(db_path: str) -> tuple:
+    """Ouvre la connexion SQLite (dans le thread de la destination)"""
+    import sqlite3
+
+    # Cree le dossier parent si necessaire
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    return db_path, sqlite3.connect(db_path)
+
+
+def _ecrire_sqlite(ressource: tuple, df: pd.DataFrame, filename: str, table_name: str) -> int:
+    """Ecrit une table dans SQLite et verifie le nombre de lignes"""
+    _, conn = ressource
+    df.to_sql(table_name, conn, if_exists='replace', index=False)
+
+    # Verification
+    cursor = conn.execute(f"SELECT COUNT(*) FROM {table_name}")
+    count = cursor.fetchone()[0]
+    print(f"Table {table_name}: {count} lignes")
+    return count
+
+
+def _fermer_sqlite(ressource: tuple) -> None:
+    """Ferme la connexion SQLite"""
+    db_path, conn = ressource
+    conn.close()
+    print(f"Base SQLite sauvegardee: {db_path}")
+
+
+def sink_sqlite(db_path: str = 'outputs/etl.db') -> tuple:
+    """
+    Destination SQLite pour le chargement (limitee par les I/O : thread)
+
+    :param db_path: Chemin vers la base SQLite
+    :return: Un tuple (nom, ouvrir, ecrire, fermer, args_ouvrir, dans_un_processus)
+    """
+    return ('sqlite', _ouvrir_sqlite, _ecrire_sqlite, _fermer_sqlite, (db_path,), False)
+
+
+def preparer_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare une table une seule fois pour toutes les destinations
+
+    :param df: Le DataFrame a charger
+    :return: Le DataFrame avec les types problematiques convertis
+    """
+    cols_period = [col for col in df.columns if 'period' in str(df[col].dtype).lower()]
+    if not cols_period:
+        return df
+
+    # Copie pour eviter de modifier l'original
+    df = df.copy()
+    for col in cols_period:
+        df[col] = df[col].astype(str)
+    return df
+
+
+def _executer_sink(sink: tuple, file_attente, resultats) -> None:
+    """
+    Boucle d'une destination : ecrit les tables recues jusqu'au signal de fin
+    (execute dans un thread ou un processus)
+
+    :param sink: Le tuple (nom, ouvrir, ecrire, fermer, args_ouvrir, dans_un_processus)
+    :param file_attente: La file des tables a ecrire
+    :param resultats: La file ou sont envoyees les statistiques (nom, stats)
+    """
+    nom, ouvrir, ecrire, fermer, args_ouvrir, _ = sink
+    stats = {'tables': 0, 'lignes': 0, 'secondes': 0.0, 'erreur': None}
+    debut = time.perf_counter()
+    ressource = None
+
+    try:
+        ressource = ouvrir(*args_ouvrir)
+    except Exception as e:
+        stats['erreur'] = repr(e)
+
+    while True:
+        element = file_attente.get()
+        if element is None:
+            break
+        # Apres une erreur, la file est videe pour ne pas bloquer les autres destinations
+        if stats['erreur'] is not None:
+            continue
+
+        df, filename, table_name = element
+        try:
+            stats['lignes'] += ecrire(ressource, df, filename, table_name)
+            stats['tables'] += 1
+        except Exception as e:
+            stats['erreur'] = repr(e)
+
+    if ressource is not None:
+        fermer(ressource)
+    stats['secondes'] = time.perf_counter() - debut
+    resultats.put((nom, stats))
+
+
+def _deposer(file_attente, element, travailleur, delai: float = 1.0) -> bool:
+    """
+    Depose un element dans la file bornee d'une destination sans bloquer
+    indefiniment si le travailleur qui la lit s'est arrete
+
+    :param file_attente: La file de la destination
+    :param element: L'element a deposer
+    :param travailleur: Le thread ou processus qui lit la file
+    :param delai: L'attente maximale (s) entre deux verifications
+    :return: False si le travailleur s'est arrete avant le depot
+    """
+    while True:
+        try:
+            file_attente.put(element, timeout=delai)
+            return True
+        except queue.Full:
+            if not travailleur.is_alive():
+                return False
+
+
+def charger_en_parallele(data: dict[str, pd.DataFrame], tables_config: list, sinks: list[tuple],
+                         taille_file: int = TAILLE_FILE_SINK) -> dict[str, dict]:
+    """
+    Docstring for charger_en_parallele
+    Prepare chaque table une seule fois et l'envoie a toutes les destinations.
+    Les destinations limitees par le CPU (CSV) tournent dans un processus et
+    recoivent la table serialisee une seule fois (pickle) ; les destinations
+    limitees par les I/O (SQLite) tournent dans un thread.
+
+    :param data: Dictionnaire de DataFrames
+    :param tables_config: Liste de tuples (key, filename, table_sqlite)
+    :param sinks: Liste de destinations (voir sink_csv, sink_sqlite)
+    :param taille_file: Nombre maximal de tables en attente par destination
+    :return: Les statistiques par destination
+    """
+    debut = time.perf_counter()
+    contexte = _contexte_processus()
+    resultats = contexte.Queue()
+
+    files = {}
+    travailleurs = {}
+    processus = []
+    threads = []
+    for sink in sinks:
+        nom, dans_un_processus = sink[0], sink[-1]
+        if dans_un_processus:
+            files[nom] = contexte.Queue(maxsize=taille_file)
+            travailleurs[nom] = contexte.Process(target=_executer_sink, args=(sink, files[nom], resultats), name=f'sink-{nom}')
+            processus.append(travailleurs[nom])
+        else:
+            files[nom] = queue.Queue(maxsize=taille_file)
+            travailleurs[nom] = threading.Thread(target=_executer_sink, args=(sink, files[nom], resultats), name=f'sink-{nom}')
+            threads.append(travailleurs[nom])
+
+    # Les processus sont demarres avant les threads de chargement (fork sans ces threads)
+    for travailleur in processus + threads:
+        travailleur.start()
+
+    stats = {}
+    arretees = set()
+    try:
+        for key, filename, table_name in tables_config:
+            if key in data:
+                df = preparer_table(data[key])
+                for nom, file_attente in files.items():
+                    if nom in arretees:
+                        continue
+                    # Attend si la destination a deja trop de tables en attente,
+                    # abandonne la destination si elle s'est arretee
+                    if not _deposer(file_attente, (df, filename, table_name), travailleurs[nom]):
+                        arretees.add(nom)
+    finally:
+        for nom, file_attente in files.items():
+            if nom in arretees or not _deposer(file_attente, None, travailleurs[nom]):
+                arretees.add(nom)
+                # Les tables non lues ne doivent pas bloquer la sortie du parent
+                if hasattr(file_attente, 'cancel_join_thread'):
+                    file_attente.cancel_join_thread()
+
+        # Les statistiques sont lues avant join (un processus attend que sa file soit videe)
+        while len(stats) < len(sinks):
+            try:
+                nom, stat = resultats.get(timeout=1)
+                stats[nom] = stat
+            except queue.Empty:
+                if not any(t.is_alive() for t in processus + threads):
+                    break
+
+        for travailleur in processus + threads:
+            travailleur.join()
+
+    for sink in sinks:
+        stats.setdefault(sink[0], {'tables': 0, 'lignes': 0, 'secondes': 0.0, 'erreur': 'arret inattendu'})
+
+    # Debit par destination
+    print(f"\nDebit par destination (total {time.perf_counter() - debut:.2f}s):")
+    for nom, stat in stats.items():
+        debit = stat['lignes'] / stat['secondes'] if stat['secondes'] > 0 else 0.0
+        print(f"  {nom:<8} {stat['tables']} tables, {stat['lignes']} lignes en {stat['secondes']:.2f}s ({debit:,.0f} lignes/s)")
+        if stat['erreur'] is not None:
+            print(f"  ERREUR ({nom}): {stat['erreur']}")
+
+    erreurs = [(nom, stat['erreur']) for nom, stat in stats.items() if stat['erreur'] is not None]
+    if erreurs:
+        raise RuntimeError(f"Echec du chargement ({erreurs[0][0]}): {erreurs[0][1]}")
+
+    return stats
+
+
 def save_to_csv(data: dict[str, pd.DataFrame], tables_config: list, output_dir: str = 'outputs') -> None:
     """
     Sauvegarde les DataFrames en fichiers CSV
@@ -652,17 +2152,8 @@ def save_to_csv(data: dict[str, pd.DataFrame], tables_config: list, output_dir:
     print("\n" + "="*50)
     print("CHARGEMENT: Sauvegarde en CSV")
     print("="*50)
-    
-    # Cree le dossier s'il n'existe pas
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Dossier '{output_dir}' cree")
-    
-    for key, filename, _ in tables_config:
-        if key in data:
-            filepath = os.path.join(output_dir, filename)
-            data[key].to_csv(filepath, index=False)
-            print(f" {filename} sauvegarde ({len(data[key])} lignes)")
+
+    charger_en_parallele(data, tables_config, [sink_csv(output_dir)])
 
 
 def save_to_sqlite(data: dict[str, pd.DataFrame], tables_config: list, db_path: str = 'outputs/etl.db') -> None:
@@ -676,33 +2167,8 @@ def save_to_sqlite(data: dict[str, pd.DataFrame], tables_config: list, db_path:
     print("\n" + "="*50)
     print("CHARGEMENT: Sauvegarde en SQLite")
     print("="*50)
-    
-    # Cree le dossier parent si necessaire
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    # Connexion a la base SQLite
-    conn = sqlite3.connect(db_path)
-    
-    for key, _, table_name in tables_config:
-        if key in data:
-            # Copie pour eviter de modifier l'original
-            df_to_save = data[key].copy()
-            
-            # Convertit les types problematiques pour SQLite
-            for col in df_to_save.columns:
-                if 'period' in str(df_to_save[col].dtype).lower():
-                    df_to_save[col] = df_to_save[col].astype(str)
-            
-            # Sauvegarde dans SQLite
-            df_to_save.to_sql(table_name, conn, if_exists='replace', index=False)
-            
-            # Verification
-            cursor = conn.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            print(f"Table {table_name}: {count} lignes")
-    
-    conn.close()
-    print(f"Base SQLite sauvegardee: {db_path}")
+
+    charger_en_parallele(data, tables_config, [sink_sqlite(db_path)])
 
 
 def load_outputs(data: dict[str, pd.DataFrame]) -> None:
@@ -722,6 +2188,10 @@ def load_outputs(data: dict[str, pd.DataFrame]) -> None:
         ('top_categories', 'top_categories.csv', 'top_categories'),
         ('delivery_metrics', 'delivery_metrics.csv', 'delivery_metrics'),
         ('reviews_monthly', 'reviews_monthly.csv', 'reviews_monthly'),
+        ('delivery_percentiles', 'delivery_percentiles.csv', 'delivery_percentiles'),
+        ('distinct_counts', 'distinct_counts.csv', 'distinct_counts'),
+        ('sketch_delivery', 'sketch_delivery.csv', 'sketch_delivery'),
+        ('sketch_distinct', 'sketch_distinct.csv', 'sketch_distinct'),
         ('customers', 'dim_customers.csv', 'dim_customers'),
         ('sellers', 'dim_sellers.csv', 'dim_sellers'),
         ('products', 'dim_products.csv', 'dim_products'),
@@ -729,11 +2199,12 @@ def load_outputs(data: dict[str, pd.DataFrame]) -> None:
         ('orders_payments', 'orders_payments.csv', 'orders_payments')
     ]
     
-    # Sauvegarde CSV (utilise key et filename)
-    save_to_csv(data, tables_config)
-    
-    # Sauvegarde SQLite (utilise key et table_name)
-    save_to_sqlite(data, tables_config)
+    # Sauvegarde CSV (utilise key et filename) et SQLite (utilise key et
+    # table_name) en parallele
+    print("\n" + "="*50)
+    print("CHARGEMENT: Sauvegarde en CSV et SQLite")
+    print("="*50)
+    charger_en_parallele(data, tables_config, [sink_csv(), sink_sqlite()])
     
     print("\nChargement termine avec succes!")
   
@@ -748,12 +2219,15 @@ def afficher_menu():
     print("3. Inspecter une table specifique")
     print("4. Transformer les donnees (Transform)")
     print("5. Charger les donnees transformees (Load CSV/SQLite)")
+    print("6. Transformer les donnees en parallele (shards par order_id)")
+    print("7. Charger les donnees depuis le cache Arrow")
     print("0. Quitter")
 
 
 def main():
     dfs = {} # Le dictionnaire pour stocker tous les df
     final_tables = {} # Pour stocker les df transformer
+    empreinte_amont = '' # Empreinte des sources chargees (cache des metriques)
 
     while True:
         afficher_menu()
@@ -762,27 +2236,29 @@ def main():
 
         if choix == '1':
             # Extraire les donnees sources
+            # Empreinte prise avant la lecture des sources
+            metadonnees = {nom_table: metadonnees_source(nom_table) for nom_table in SOURCES}
+            empreinte_amont = empreinte_sources(metadonnees)
             dfs = extract_sources()
             print("Donnees chargees avec succes.")
+            sauvegarder_cache_arrow(dfs, 'extract', metadonnees)
         
         elif choix == '2':
-            # Verifier que les donnees sont chargees
+            # Sans donnees en memoire, apercu rapide des sources (sans pandas)
             if not dfs:
-                print("Erreur : Chargez d'abord les donnees (Option 1).")
+                for nom_table in SOURCES:
+                    if not inspecter_source_rapide(nom_table):
+                        print(f"Source {nom_table} introuvable.")
             else:
                 for nom_table, df in dfs.items():
                     inspecter_data(nom_table, df)
 
         elif choix == '3':
-            # Verifier que les donnees sont chargees
-            if not dfs:
-                print("Erreur : Chargez d'abord les donnees (Option 1).")
-            else:
-                nom_table = input("Quelle table inspecter ? (ex: orders) : ")
-                if nom_table in dfs:
-                    inspecter_data(nom_table, dfs[nom_table])
-                else:
-                    print("Table introuvable.")
+            nom_table = input("Quelle table inspecter ? (ex: orders) : ")
+            if nom_table in dfs:
+                inspecter_data(nom_table, dfs[nom_table])
+            elif dfs or not inspecter_source_rapide(nom_table):
+                print("Table introuvable.")
 
         elif choix == '4':
             # Verifier que les donnees sont chargees
@@ -790,7 +2266,7 @@ def main():
                 print("Erreur : Chargez d'abord les donnees.")
             else:
                 # Tranformer les donnees
-                final_tables = transform_data(dfs)
+                final_tables = transform_data(dfs, empreinte_amont)
                 print("Transformation terminee.")
 
         elif choix == '5':
@@ -799,6 +2275,25 @@ def main():
             else:
                 load_outputs(final_tables)
 
+        elif choix == '6':
+            if not dfs:
+                print("Erreur : Chargez d'abord les donnees.")
+            else:
+                # Tranformer les donnees par shards dans un pool de processus
+                final_tables = transform_data_shards(dfs, empreinte_amont=empreinte_amont)
+                print("Transformation parallele terminee.")
+
+        elif choix == '7':
+            # Ouvrir les tables extraites par memory-map (sans relire les CSV)
+            # Le cache n'est relu que si ses signatures sont exactement celles des sources
+            metadonnees = {nom_table: metadonnees_source(nom_table) for nom_table in SOURCES}
+            dfs = charger_cache_arrow('extract', metadonnees)
+            empreinte_amont = empreinte_sources(metadonnees) if dfs else ''
+            if dfs:
+                print("Donnees chargees depuis le cache Arrow.")
+            else:
+                print("Erreur : Aucun cache Arrow a jour, chargez d'abord les donnees (Option 1).")
+
         elif choix == '0':
             break
 